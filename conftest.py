@@ -0,0 +1,150 @@
+"""
+🧪 HARNAIS DE TEST PREFECT EN PROCESS
+=====================================
+
+Remplace la stack docker-compose (Postgres, Redis, serveur, worker) pendant
+les tests : une API Prefect locale sur SQLite est démarrée au premier test
+qui demande la fixture `prefect_api`, puis partagée par toute la session.
+Sans test qui l'utilise (--collect-only, -k autre_chose, autres tests), elle
+ne démarre pas.
+
+    python -m pytest -q
+
+Dans un test (voir test_flows.py), importer les scripts APRÈS la fixture :
+ils vérifient le serveur dès l'import (flow_basic_v2.py) et lisent
+PREFECT_API_URL avant d'importer Prefect.
+
+    def test_rapide(prefect_api):
+        import flow_basic
+        assert flow_basic.test_rapide().startswith("✅")
+
+⚠️ Jamais de `from flow_basic import test_rapide` au niveau du module de
+test : pytest collecterait le flow comme un test.
+
+Coût mesuré (Prefect 3.8.8) : ~15s de démarrage par session, puis ~0.2s
+par flow run (200 tests test_rapide : 227ms en moyenne, 46s au total).
+Chaque flow run fait encore plusieurs appels HTTP à la vraie API : des
+centaines de tests prennent des dizaines de secondes, pas quelques
+secondes. Le résumé pytest affiche ces chiffres pour chaque session.
+"""
+
+import os
+import time
+import importlib.util
+from contextlib import ExitStack
+
+import pytest
+
+_harnais = {
+    "pile": None,
+    "api_url": None,
+    "demarrage_s": None,
+    "env": {},
+    "durees_s": [],
+}
+
+
+def demarrer_api():
+    """Démarrer l'API Prefect SQLite temporaire et y pointer l'environnement"""
+    from prefect.testing.utilities import prefect_test_harness
+    from prefect.settings import (
+        PREFECT_API_URL,
+        PREFECT_FLOWS_HEARTBEAT_FREQUENCY,
+        PREFECT_LOGGING_TO_API_ENABLED,
+        PREFECT_SERVER_ANALYTICS_ENABLED,
+        PREFECT_SERVER_SERVICES_EVENT_PERSISTER_ENABLED,
+        PREFECT_SERVER_SERVICES_TASK_RUN_RECORDER_ENABLED,
+        temporary_settings,
+    )
+
+    # Jamais de proxy d'entreprise vers l'API locale (y compris pendant
+    # l'attente du démarrage du serveur dans prefect_test_harness)
+    for var in ["NO_PROXY", "no_proxy"]:
+        existant = os.environ.get(var)
+        os.environ[var] = f"{existant},localhost,127.0.0.1" if existant else "localhost,127.0.0.1"
+
+    debut = time.perf_counter()
+    # Enregistrée tout de suite : refermée en fin de session même si le
+    # démarrage du serveur échoue
+    _harnais["pile"] = pile = ExitStack()
+    pile.enter_context(temporary_settings(updates={
+        # Pas d'envoi des logs à l'API
+        PREFECT_LOGGING_TO_API_ENABLED: False,
+        # Pas de heartbeat : chaque flow run attend l'arrêt du thread (~1s)
+        PREFECT_FLOWS_HEARTBEAT_FREQUENCY: None,
+        # Pas de télémétrie : elle verrouille la base SQLite au démarrage
+        PREFECT_SERVER_ANALYTICS_ENABLED: False,
+        # Leurs écritures par lots verrouillent SQLite : l'API répond 503 et
+        # le client réessaie ~2s plus tard. Les tests vérifient les valeurs
+        # retournées, pas l'historique des events / task runs côté serveur.
+        PREFECT_SERVER_SERVICES_EVENT_PERSISTER_ENABLED: False,
+        PREFECT_SERVER_SERVICES_TASK_RUN_RECORDER_ENABLED: False,
+    }))
+    pile.enter_context(prefect_test_harness())
+
+    api_url = PREFECT_API_URL.value()
+
+    # Les scripts lisent PREFECT_API_URL (setdefault) avant d'importer Prefect
+    os.environ["PREFECT_API_URL"] = api_url
+    # Pas d'attente simulée ni de délai entre retries
+    os.environ["CARREFOUR_DUREE_SIMULATION_S"] = "0"
+    os.environ["CARREFOUR_DELAI_RETRY_EXTRACTION_S"] = "0"
+    os.environ["CARREFOUR_DELAI_RETRY_FLOW_S"] = "0"
+
+    _harnais.update(
+        api_url=api_url,
+        demarrage_s=time.perf_counter() - debut,
+    )
+
+
+def arreter_api():
+    _harnais["pile"].close()
+    _harnais["pile"] = None
+
+
+def pytest_sessionstart(session):
+    # Les scripts écrivent aussi dans os.environ à l'import (HTTP_PROXY,
+    # PREFECT_SERVER_ALLOW_EPHEMERAL_MODE...) : tout est restauré à la fin
+    _harnais["env"] = dict(os.environ)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if _harnais["pile"] is not None:
+        arreter_api()
+    os.environ.clear()
+    os.environ.update(_harnais["env"])
+
+
+@pytest.fixture(scope="session")
+def prefect_api():
+    """URL de l'API Prefect locale, démarrée au premier usage (partagée
+    par toute la session, arrêtée dans pytest_sessionfinish)"""
+    if importlib.util.find_spec("prefect") is None:
+        pytest.skip("Prefect n'est pas installé")
+    demarrer_api()
+    return _harnais["api_url"]
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    debut = time.perf_counter()
+    yield
+    if "prefect_api" in item.fixturenames:
+        _harnais["durees_s"].append(time.perf_counter() - debut)
+
+
+def pytest_terminal_summary(terminalreporter):
+    if _harnais["demarrage_s"] is None:
+        return
+
+    durees = sorted(_harnais["durees_s"])
+    terminalreporter.write_sep("=", "API Prefect en process")
+    terminalreporter.write_line(f"   URL        : {_harnais['api_url']}")
+    terminalreporter.write_line(f"   Démarrage  : {_harnais['demarrage_s']:.2f}s (une fois par session)")
+    if durees:
+        p95 = durees[max(0, -(-len(durees) * 95 // 100) - 1)]
+        terminalreporter.write_line(
+            f"   Par test   : {len(durees)} tests, "
+            f"moyenne {sum(durees) / len(durees) * 1000:.0f}ms, "
+            f"p95 {p95 * 1000:.0f}ms, max {durees[-1] * 1000:.0f}ms"
+        )
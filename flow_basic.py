@@ -10,8 +10,8 @@ python quick_test.py
 import os
 from datetime import datetime
 
-# Configuration obligatoire
-os.environ["PREFECT_API_URL"] = "http://localhost:4200/api"
+# Configuration obligatoire (PREFECT_API_URL déjà défini = prioritaire, ex: conftest.py)
+os.environ.setdefault("PREFECT_API_URL", "http://localhost:4200/api")
 os.environ["PREFECT_SERVER_ALLOW_EPHEMERAL_MODE"] = "false"
 from prefect import flow, task
 os.environ["HTTP_PROXY"] = ""
@@ -58,7 +58,7 @@ if __name__ == "__main__":
     # Vérification express
     try:
         import requests
-        if requests.get("http://localhost:4200/api/health", timeout=3).status_code == 200:
+        if requests.get(f"{os.environ['PREFECT_API_URL']}/health", timeout=3).status_code == 200:
             print("✅ Prefect accessible")
         else:
             print("❌ Prefect non accessible")
@@ -17,8 +17,9 @@ from datetime import datetime
 # !! CONFIGURATION AVANT TOUT IMPORT PREFECT !!
 print("🔧 Configuration AVANT import Prefect...")
 
-# Forcer l'API URL AVANT l'import de Prefect
-os.environ["PREFECT_API_URL"] = "http://localhost:4200/api"
+# Forcer l'API URL AVANT l'import de Prefect (sauf si déjà définie, ex: conftest.py)
+os.environ.setdefault("PREFECT_API_URL", "http://localhost:4200/api")
+URL_SANTE = f"{os.environ['PREFECT_API_URL']}/health"
 
 # Désactiver explicitement le démarrage de serveur temporaire
 os.environ["PREFECT_SERVER_ALLOW_EPHEMERAL_MODE"] = "false"
@@ -39,7 +40,7 @@ def verify_server_connection():
         try:
             print(f"   Tentative {attempt}/{max_attempts}...")
             response = requests.get(
-                "http://localhost:4200/api/health",
+                URL_SANTE,
                 timeout=10,
                 proxies={'http': '', 'https': ''}  # Force no proxy
             )
@@ -114,7 +115,7 @@ def test_connection_dans_task():
     """Tâche qui teste la connectivité depuis l'intérieur du flow"""
     try:
         response = requests.get(
-            "http://localhost:4200/api/health",
+            URL_SANTE,
             timeout=5,
             proxies={'http': '', 'https': ''}
         )
@@ -227,7 +228,7 @@ if __name__ == "__main__":
         print("\n🔧 Diagnostic :")
         print("   • Le serveur Docker est-il toujours accessible ?")
         print("   • Y a-t-il des erreurs dans les logs du serveur ?")
-        print(f"   • Testez: curl http://localhost:4200/api/health")
+        print(f"   • Testez: curl {URL_SANTE}")
         
         import traceback
         print(f"\n📋 Stack trace complète :")
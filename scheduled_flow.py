@@ -13,7 +13,14 @@ import os
 from datetime import datetime, timedelta
 
 # !! CONFIG OBLIGATOIRE AVANT IMPORT PREFECT !!
-os.environ["PREFECT_API_URL"] = "http://localhost:4200/api"
+# (PREFECT_API_URL déjà défini = prioritaire : worker Docker, conftest.py...)
+os.environ.setdefault("PREFECT_API_URL", "http://localhost:4200/api")
+
+# Durée de l'extraction simulée et délais entre retries (0 dans les tests)
+DUREE_SIMULATION_S = float(os.environ.get("CARREFOUR_DUREE_SIMULATION_S", "2"))
+DELAI_RETRY_EXTRACTION_S = float(os.environ.get("CARREFOUR_DELAI_RETRY_EXTRACTION_S", "60"))
+DELAI_RETRY_FLOW_S = float(os.environ.get("CARREFOUR_DELAI_RETRY_FLOW_S", "300"))
+
 os.environ["PREFECT_SERVER_ALLOW_EPHEMERAL_MODE"] = "false"
 
 from prefect import flow, task
@@ -23,11 +30,11 @@ from prefect.client.schemas.schedules import CronSchedule  # <-- Schedule cron (
 # TÂCHES MÉTIER (exemples à adapter)
 # =============================================
 
-@task(name="extraction", retries=3, retry_delay_seconds=60)
+@task(name="extraction", retries=3, retry_delay_seconds=DELAI_RETRY_EXTRACTION_S)
 def extraire_donnees_carrefour(source: str, date: str):
     print(f"📥 Extraction depuis {source} pour le {date}")
     import time
-    time.sleep(2)  # Simulation
+    time.sleep(DUREE_SIMULATION_S)  # Simulation
     donnees_fictives = {
         "nb_records": 1500,
         "source": source,
@@ -85,7 +92,7 @@ Status: {status_text}
     description="Template ETL pour environnement Carrefour",
     log_prints=True,
     retries=1,
-    retry_delay_seconds=300
+    retry_delay_seconds=DELAI_RETRY_FLOW_S
 )
 def etl_carrefour_template(
     source: str = "database_carrefour",
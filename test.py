@@ -4,21 +4,47 @@
 ===========================
 
 Compare curl (qui fonctionne) vs Python/requests
+
+Mode profilage (--profil) : lance toutes les variantes EN PARALLÈLE,
+N requêtes chacune, et mesure latence p50/p95/p99, connexion vs
+premier octet, taux d'erreur et réutilisation keep-alive.
+
+    python test.py --profil -n 50 -p 8 --json resultats.json
 """
 
 import os
-import requests
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import threading
 import subprocess
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+import requests
+
+URL_SANTE = "http://localhost:4200/api/health"
 
-def test_curl():
+
+def base_api(url):
+    """URL de base de l'API Prefect à partir de l'URL de santé (.../api/health)"""
+    return url[:-len("/health")]
+
+
+def test_curl(url=URL_SANTE, timeout=5):
     """Test avec curl (comme vous avez fait)"""
     print("1️⃣ Test avec CURL :")
     try:
         result = subprocess.run(
-            ['curl', '-s', '-w', '%{http_code}', 'http://localhost:4200/api/health'],
+            ['curl', '-s', '-w', '%{http_code}', url],
             capture_output=True,
             text=True,
-            timeout=5
+            timeout=timeout
         )
         print(f"   Status: {result.returncode}")
         print(f"   Output: {result.stdout}")
@@ -28,14 +54,14 @@ def test_curl():
         print(f"   ❌ Erreur CURL: {e}")
         return False
 
-def test_python_normal():
+def test_python_normal(url=URL_SANTE, timeout=5):
     """Test Python normal (avec proxies hérités)"""
     print("\n2️⃣ Test Python NORMAL (avec proxies hérités) :")
     print(f"   HTTP_PROXY: {os.environ.get('HTTP_PROXY', 'NON_DÉFINI')}")
     print(f"   NO_PROXY: {os.environ.get('NO_PROXY', 'NON_DÉFINI')}")
     
     try:
-        response = requests.get("http://localhost:4200/api/health", timeout=5)
+        response = requests.get(url, timeout=timeout)
         print(f"   Status: {response.status_code}")
         print(f"   Response: {response.text[:50]}...")
         print(f"   ✅ Python normal fonctionne")
@@ -44,7 +70,7 @@ def test_python_normal():
         print(f"   ❌ Python normal échoue: {e}")
         return False
 
-def test_python_no_proxy():
+def test_python_no_proxy(url=URL_SANTE, timeout=5):
     """Test Python avec proxies explicitement désactivés"""
     print("\n3️⃣ Test Python SANS PROXY :")
     
@@ -70,7 +96,7 @@ def test_python_no_proxy():
     print(f"   NO_PROXY forcé: '{os.environ.get('NO_PROXY')}'")
     
     try:
-        response = requests.get("http://localhost:4200/api/health", timeout=5)
+        response = requests.get(url, timeout=timeout)
         print(f"   Status: {response.status_code}")
         print(f"   Response: {response.text[:50]}...")
         print(f"   ✅ Python sans proxy fonctionne")
@@ -88,7 +114,7 @@ def test_python_no_proxy():
     
     return success
 
-def test_python_session():
+def test_python_session(url=URL_SANTE, timeout=5):
     """Test avec session requests configurée manuellement"""
     print("\n4️⃣ Test Python SESSION (proxy désactivé dans requests) :")
     
@@ -100,7 +126,7 @@ def test_python_session():
     }
     
     try:
-        response = session.get("http://localhost:4200/api/health", timeout=5)
+        response = session.get(url, timeout=timeout)
         print(f"   Status: {response.status_code}")
         print(f"   Response: {response.text[:50]}...")
         print(f"   ✅ Python session fonctionne")
@@ -109,12 +135,12 @@ def test_python_session():
         print(f"   ❌ Python session échoue: {e}")
         return False
 
-def test_prefect_client():
+def test_prefect_client(url=URL_SANTE, timeout=5):
     """Test avec le client Prefect directement"""
     print("\n5️⃣ Test CLIENT PREFECT :")
     
     # Forcer la config Prefect
-    os.environ["PREFECT_API_URL"] = "http://localhost:4200/api"
+    os.environ["PREFECT_API_URL"] = base_api(url)
     os.environ["HTTP_PROXY"] = ""
     os.environ["HTTPS_PROXY"] = ""
     
@@ -123,7 +149,7 @@ def test_prefect_client():
         import asyncio
         
         async def test_client():
-            async with get_client() as client:
+            async with get_client(httpx_settings={"timeout": timeout}) as client:
                 # Test simple de connectivité
                 health = await client._client.get("/health")
                 return health.status_code == 200
@@ -136,7 +162,378 @@ def test_prefect_client():
         print(f"   ❌ Client Prefect échoue: {e}")
         return False
 
+# =========================================
+# MODE PROFILAGE (concurrent, N requêtes par variante)
+# =========================================
+
+# Mesures par thread : chaque worker n'exécute qu'une requête à la fois
+_mesure = threading.local()
+
+
+@contextmanager
+def instrumenter_urllib3():
+    """Chronométrer l'ouverture des sockets urllib3 (connexion TCP).
+
+    Si aucune socket n'est ouverte pendant une requête, la connexion
+    keep-alive du pool a été réutilisée.
+    """
+    from urllib3.connection import HTTPConnection
+
+    original = HTTPConnection._new_conn
+
+    def _new_conn(self):
+        debut = time.perf_counter()
+        try:
+            return original(self)
+        finally:
+            _mesure.connect_s = time.perf_counter() - debut
+
+    HTTPConnection._new_conn = _new_conn
+    try:
+        yield
+    finally:
+        HTTPConnection._new_conn = original
+
+
+def mesure(ok, total_s, connect_s=None, ttfb_s=None, reutilisee=False, status=None, erreur=None):
+    """Résultat d'une requête (temps en millisecondes)"""
+    en_ms = lambda s: round(s * 1000, 3) if s is not None else None
+    return {
+        "ok": ok,
+        "status": status,
+        "total_ms": en_ms(total_s),
+        "connect_ms": en_ms(connect_s),
+        "ttfb_ms": en_ms(ttfb_s),
+        "reutilisee": reutilisee,
+        "erreur": erreur,
+    }
+
+
+def requete_curl(url, timeout):
+    """Une requête curl (nouveau processus, donc jamais de keep-alive)"""
+    debut = time.perf_counter()
+    try:
+        result = subprocess.run(
+            ['curl', '-s', '-o', os.devnull, '--max-time', str(timeout), '-w',
+             '%{http_code} %{time_connect} %{time_starttransfer} %{time_total} %{num_connects}', url],
+            capture_output=True,
+            text=True,
+            timeout=timeout + 1
+        )
+        if result.returncode != 0:
+            return mesure(False, time.perf_counter() - debut, erreur=f"curl exit {result.returncode}")
+        code, connect, ttfb, total, nb_connexions = result.stdout.split()
+        reutilisee = int(nb_connexions) == 0
+        return mesure(
+            code == "200", float(total),
+            connect_s=None if reutilisee else float(connect),
+            ttfb_s=float(ttfb),
+            reutilisee=reutilisee,
+            status=int(code),
+            erreur=None if code == "200" else f"HTTP {code}"
+        )
+    except Exception as e:
+        return mesure(False, time.perf_counter() - debut, erreur=type(e).__name__)
+
+
+def requete_requests(get, url, timeout):
+    """Une requête via requests ; `get` choisit la variante (global, session...)"""
+    _mesure.connect_s = None
+    debut = time.perf_counter()
+    try:
+        # with : la connexion est rendue au pool même si la lecture échoue
+        with get(url, timeout=timeout, stream=True) as response:
+            # elapsed = envoi -> en-têtes reçus, soit le temps jusqu'au premier octet
+            ttfb = response.elapsed.total_seconds()
+            response.content
+        total = time.perf_counter() - debut
+        ok = response.status_code == 200
+        return mesure(
+            ok, total,
+            connect_s=_mesure.connect_s,
+            ttfb_s=ttfb,
+            reutilisee=_mesure.connect_s is None,
+            status=response.status_code,
+            erreur=None if ok else f"HTTP {response.status_code}"
+        )
+    except Exception as e:
+        return mesure(False, time.perf_counter() - debut, erreur=type(e).__name__)
+
+
+def variante_curl(url, nb, parallelisme, timeout):
+    with ThreadPoolExecutor(max_workers=parallelisme) as pool:
+        return list(pool.map(lambda _: requete_curl(url, timeout), range(nb)))
+
+
+def variante_python_normal(url, nb, parallelisme, timeout):
+    """requests.get : proxies hérités, nouvelle connexion à chaque appel"""
+    with ThreadPoolExecutor(max_workers=parallelisme) as pool:
+        return list(pool.map(lambda _: requete_requests(requests.get, url, timeout), range(nb)))
+
+
+def variante_python_no_proxy(url, nb, parallelisme, timeout):
+    """Variables proxy ignorées (équivalent des variables vidées, sans
+    toucher à os.environ pendant que les autres variantes tournent)"""
+    def get(url, **kwargs):
+        with requests.Session() as session:
+            session.trust_env = False
+            return session.get(url, **kwargs)
+
+    with ThreadPoolExecutor(max_workers=parallelisme) as pool:
+        return list(pool.map(lambda _: requete_requests(get, url, timeout), range(nb)))
+
+
+def variante_python_session(url, nb, parallelisme, timeout):
+    """Une session sans proxy par worker : la connexion keep-alive est réutilisée"""
+    sessions = threading.local()
+
+    def get(url, **kwargs):
+        if not hasattr(sessions, "session"):
+            sessions.session = requests.Session()
+            sessions.session.proxies = {'http': '', 'https': ''}
+        return sessions.session.get(url, **kwargs)
+
+    with ThreadPoolExecutor(max_workers=parallelisme) as pool:
+        return list(pool.map(lambda _: requete_requests(get, url, timeout), range(nb)))
+
+
+def variante_prefect_client(url, nb, parallelisme, timeout):
+    """Client Prefect (httpx) : `parallelisme` requêtes simultanées sur un client partagé.
+
+    Le client Prefect réessaie seul les réponses 429/503 (avec attente) :
+    ces retries sont désactivés ici (PREFECT_CLIENT_MAX_RETRIES=0), sinon
+    son taux d'erreur et son p99 ne seraient pas comparables aux variantes
+    requests.
+    """
+    try:
+        from prefect.client.orchestration import get_client
+        from prefect.settings import PREFECT_API_URL, PREFECT_CLIENT_MAX_RETRIES, temporary_settings
+    except Exception as e:
+        return [mesure(False, 0, erreur=type(e).__name__)] * nb
+
+    api_url = base_api(url)
+
+    async def une_requete(client, semaphore):
+        async with semaphore:
+            temps = {}
+
+            async def trace(evenement, info):
+                if evenement.endswith("connect_tcp.started"):
+                    temps["connect_debut"] = time.perf_counter()
+                elif evenement.endswith("connect_tcp.complete"):
+                    temps["connect_fin"] = time.perf_counter()
+                elif evenement.endswith("receive_response_headers.complete"):
+                    temps["ttfb"] = time.perf_counter()
+
+            debut = time.perf_counter()
+            try:
+                response = await client._client.get("/health", extensions={"trace": trace})
+                total = time.perf_counter() - debut
+                reutilisee = "connect_debut" not in temps
+                ok = response.status_code == 200
+                return mesure(
+                    ok, total,
+                    connect_s=None if reutilisee else temps["connect_fin"] - temps["connect_debut"],
+                    ttfb_s=temps["ttfb"] - debut if "ttfb" in temps else None,
+                    reutilisee=reutilisee,
+                    status=response.status_code,
+                    erreur=None if ok else f"HTTP {response.status_code}"
+                )
+            except Exception as e:
+                return mesure(False, time.perf_counter() - debut, erreur=type(e).__name__)
+
+    async def toutes_les_requetes():
+        semaphore = asyncio.Semaphore(parallelisme)
+        async with get_client(httpx_settings={"trust_env": False, "timeout": timeout}) as client:
+            return await asyncio.gather(*(une_requete(client, semaphore) for _ in range(nb)))
+
+    try:
+        with temporary_settings(updates={PREFECT_API_URL: api_url, PREFECT_CLIENT_MAX_RETRIES: 0}):
+            return asyncio.run(toutes_les_requetes())
+    except Exception as e:
+        return [mesure(False, 0, erreur=type(e).__name__)] * nb
+
+
+VARIANTES = [
+    ("CURL", variante_curl),
+    ("Python normal", variante_python_normal),
+    ("Python sans proxy", variante_python_no_proxy),
+    ("Python session", variante_python_session),
+    ("Client Prefect", variante_prefect_client),
+]
+
+
+def percentile(valeurs, p):
+    """Percentile au rang le plus proche (valeurs déjà triées)"""
+    if not valeurs:
+        return None
+    rang = max(1, -(-len(valeurs) * p // 100))
+    return valeurs[int(rang) - 1]
+
+
+def distribution(valeurs):
+    valeurs = sorted(v for v in valeurs if v is not None)
+    if not valeurs:
+        return None
+    return {
+        "p50": percentile(valeurs, 50),
+        "p95": percentile(valeurs, 95),
+        "p99": percentile(valeurs, 99),
+        "min": valeurs[0],
+        "max": valeurs[-1],
+        "moyenne": round(sum(valeurs) / len(valeurs), 3),
+    }
+
+
+def resumer(mesures):
+    """Statistiques d'une variante à partir de ses mesures"""
+    reussies = [m for m in mesures if m["ok"]]
+    erreurs = Counter(m["erreur"] for m in mesures if not m["ok"])
+    reutilisees = sum(1 for m in reussies if m["reutilisee"])
+    return {
+        "requetes": len(mesures),
+        "erreurs": sum(erreurs.values()),
+        "taux_erreur": round(sum(erreurs.values()) / len(mesures), 4) if mesures else None,
+        "types_erreur": dict(erreurs),
+        "latence_ms": distribution(m["total_ms"] for m in reussies),
+        "connect_ms": distribution(m["connect_ms"] for m in reussies),
+        "ttfb_ms": distribution(m["ttfb_ms"] for m in reussies),
+        "connexions_nouvelles": len(reussies) - reutilisees,
+        "connexions_reutilisees": reutilisees,
+        "taux_reutilisation": round(reutilisees / len(reussies), 4) if reussies else None,
+    }
+
+
+def profiler(url=URL_SANTE, nb=20, parallelisme=4, timeout=5):
+    """Exécuter toutes les variantes en même temps et résumer chacune"""
+    debut = time.perf_counter()
+    with instrumenter_urllib3(), ThreadPoolExecutor(max_workers=len(VARIANTES)) as pool:
+        futures = {
+            name: pool.submit(variante, url, nb, parallelisme, timeout)
+            for name, variante in VARIANTES
+        }
+        variantes = {name: resumer(future.result()) for name, future in futures.items()}
+
+    return {
+        "date": datetime.now().isoformat(),
+        "hote": platform.node(),
+        "url": url,
+        "requetes_par_variante": nb,
+        "parallelisme": parallelisme,
+        "timeout_s": timeout,
+        "duree_s": round(time.perf_counter() - debut, 3),
+        "proxy": {var: os.environ.get(var) for var in ['HTTP_PROXY', 'HTTPS_PROXY', 'NO_PROXY']},
+        "variantes": variantes,
+    }
+
+
+def afficher_profil(rapport):
+    print(f"\n📊 PROFIL ({rapport['requetes_par_variante']} requêtes/variante, "
+          f"parallélisme {rapport['parallelisme']}, {rapport['duree_s']}s) :")
+    print("=" * 96)
+    print(f"   {'Variante':<20} {'Erreurs':>8} {'p50':>8} {'p95':>8} {'p99':>8} "
+          f"{'connect':>9} {'ttfb':>8} {'keep-alive':>11}")
+
+    fmt = lambda v: f"{v:.1f}" if v is not None else "-"
+    for name, stats in rapport["variantes"].items():
+        latence = stats["latence_ms"] or {}
+        connect = stats["connect_ms"] or {}
+        ttfb = stats["ttfb_ms"] or {}
+        reutilisation = stats["taux_reutilisation"]
+        print(f"   {name:<20} {stats['taux_erreur']:>8.0%} "
+              f"{fmt(latence.get('p50')):>8} {fmt(latence.get('p95')):>8} {fmt(latence.get('p99')):>8} "
+              f"{fmt(connect.get('p50')):>9} {fmt(ttfb.get('p50')):>8} "
+              f"{(f'{reutilisation:.0%}' if reutilisation is not None else '-'):>11}")
+        for erreur, nombre in stats["types_erreur"].items():
+            print(f"      ❌ {erreur}: {nombre}")
+
+    print("   (temps en ms ; connect et ttfb = p50)")
+
+
+def main_profil(args):
+    """Profiler et afficher le rapport ; retourne le code de sortie
+    (1 si au moins une variante a des erreurs)"""
+    # Avec --json -, stdout ne contient que le JSON (bannière sur stderr)
+    sortie = sys.stderr if args.json == "-" else sys.stdout
+    print("⏱️  PROFIL CONNECTIVITÉ (variantes en parallèle)", file=sortie)
+    print("=" * 60, file=sortie)
+    print(f"   URL: {args.url}", file=sortie)
+
+    rapport = profiler(args.url, args.requetes, args.parallelisme, args.timeout)
+
+    if args.json == "-":
+        json.dump(rapport, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        afficher_profil(rapport)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(rapport, f, indent=2, ensure_ascii=False)
+            print(f"\n💾 Rapport JSON : {args.json}")
+
+    en_erreur = [name for name, stats in rapport["variantes"].items() if stats["erreurs"]]
+    if en_erreur:
+        print(f"\n❌ Variantes en erreur : {', '.join(en_erreur)}", file=sortie)
+        return 1
+    return 0
+
+
+def entier_positif(valeur):
+    nombre = int(valeur)
+    if nombre < 1:
+        raise argparse.ArgumentTypeError(f"doit être >= 1 (reçu {valeur})")
+    return nombre
+
+
+def duree_positive(valeur):
+    duree = float(valeur)
+    if duree <= 0:
+        raise argparse.ArgumentTypeError(f"doit être > 0 (reçu {valeur})")
+    return duree
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Diagnostic connectivité Python vs curl")
+    parser.add_argument("--profil", action="store_true",
+                        help="profiler toutes les variantes en parallèle")
+    parser.add_argument("-n", "--requetes", type=entier_positif,
+                        help="--profil : requêtes par variante (défaut: 20)")
+    parser.add_argument("-p", "--parallelisme", type=entier_positif,
+                        help="--profil : requêtes simultanées par variante (défaut: 4)")
+    parser.add_argument("--timeout", type=duree_positive, default=5,
+                        help="timeout par requête en secondes (défaut: 5)")
+    parser.add_argument("--url", default=URL_SANTE,
+                        help=f"endpoint de santé de l'API Prefect, en /health (défaut: {URL_SANTE})")
+    parser.add_argument("--json", metavar="FICHIER",
+                        help="--profil : écrire le rapport JSON ('-' pour la sortie standard)")
+    args = parser.parse_args()
+
+    # Le client Prefect appelle <base>/health : toutes les variantes doivent
+    # viser le même endpoint pour que les résultats soient comparables
+    if not args.url.endswith("/health"):
+        parser.error(f"--url doit se terminer par /health (reçu {args.url})")
+
+    if not args.profil:
+        options_profil = [
+            option for option, value in
+            [("-n", args.requetes), ("-p", args.parallelisme), ("--json", args.json)]
+            if value is not None
+        ]
+        if options_profil:
+            parser.error(f"{', '.join(options_profil)} : uniquement avec --profil")
+
+    if args.requetes is None:
+        args.requetes = 20
+    if args.parallelisme is None:
+        args.parallelisme = 4
+    return args
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    if args.profil:
+        sys.exit(main_profil(args))
+
     print("🔍 DIAGNOSTIC CONNECTIVITÉ PYTHON vs CURL")
     print("=" * 60)
     
@@ -158,7 +555,7 @@ if __name__ == "__main__":
     
     results = {}
     for name, test_func in tests:
-        results[name] = test_func()
+        results[name] = test_func(args.url, args.timeout)
     
     print("\n" + "=" * 60)
     print("📊 RÉSUMÉ DES TESTS :")
@@ -179,4 +576,4 @@ if __name__ == "__main__":
         print("   🔧 Problème plus profond - vérifiez la configuration réseau Docker")
         print("   💡 Essayez d'exécuter le script depuis le conteneur Docker directement")
     
-    print(f"\n🌐 Interface Prefect : http://localhost:4200")
\ No newline at end of file
+    print(f"\n🌐 Interface Prefect : {args.url[:-len('/api/health')]}")
\ No newline at end of file
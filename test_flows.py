@@ -0,0 +1,35 @@
+"""
+Flows du repo exécutés contre l'API Prefect en process (voir conftest.py)
+
+Les scripts sont importés dans les tests, après la fixture prefect_api :
+ils vérifient le serveur et lisent PREFECT_API_URL dès l'import.
+"""
+
+import pytest
+
+pytest.importorskip("requests")
+
+
+def test_rapide(prefect_api):
+    import flow_basic
+
+    assert flow_basic.test_rapide().startswith("✅")
+
+
+def test_flow_force_serveur(prefect_api):
+    import flow_basic_v2
+
+    resume = flow_basic_v2.flow_force_serveur(nb_etapes=2)
+    assert resume["total_etapes"] == 2
+    assert resume["environnement"]["prefect_api_url"] == prefect_api
+
+
+def test_etl_carrefour_template(prefect_api):
+    import scheduled_flow
+
+    resultat = scheduled_flow.etl_carrefour_template(
+        source="test_source",
+        destination="test_destination"
+    )
+    assert resultat["status"] == "SUCCESS"
+    assert resultat["records_traites"] == 1450